@@ -6,12 +6,10 @@
 # This file contains the tests that use the normal_to_face=True feature of
 # TetSymmetry.
 
-# WARNING: I cannot get cvxpy to play nicely with my other dependencies in my
-# Anaconda environment, so this file only contains tests that depend on cvxpy,
-# which are only the ones that initialize TetSymmetry with normal_to_face=True.
-# To visualize results, the evaluated grids are saved as npy files and
-# triangulated with marching cubes in a different test suite that does not
-# depend on cvxpy.
+# NOTE: These tests used to be kept apart because normal_to_face=True depended
+# on cvxpy, which does not play nicely with the geometry dependencies. It no
+# longer does, but the evaluated grids are still saved as npy files and
+# triangulated with marching cubes in a different test suite.
 
 import unittest
 
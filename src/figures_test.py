@@ -6,10 +6,8 @@
 # This file contains the tests used to generate the meshes for the figures in
 # the manuscript, as well as some miscellaneous meshes for testing.
 
-# WARNING: I cannot get cvxpy to play nicely with my other dependencies in my
-# Anaconda environment, so any tests that depend on cvxpy (only the ones that
-# initialize TetSymmetry with normal_to_face=True) have been moved to a
-# different test file.
+# NOTE: Tests that initialize TetSymmetry with normal_to_face=True live in
+# face_normal_test.py.
 
 import unittest
 
@@ -6,7 +6,10 @@
 # This file contains functions for constructing Fourier basis functions with
 # tetrahedral symmetry.
 
-from typing import Tuple
+import contextlib
+import functools
+import types
+from typing import Mapping, Optional, Tuple
 
 import numpy as np
 import scipy.fft
@@ -113,7 +116,7 @@ kSymmetries = np.array([
     [[0, -1, 0],
      [-1, 0, 0],
      [0, 0, 1]],
-], dtype=int)
+], dtype=np.int64)
 
 # This is a regular tetrahedron centered at the origin.
 # Vertices are ordered in VTK ordering.
@@ -133,37 +136,136 @@ kIntegerLatticePlanes = np.array([
     [0, -1, -1],
     [0, -1, 1],
     [-1, 1, 0],
-], dtype=int)
+], dtype=np.int64)
 
-def _IsSymmetric(mat: np.ndarray):
-    if mat.shape[0] != mat.shape[1]: return False
-    n = mat.shape[0]
-    kTol = 1e-12
-    for i in range(n):
-        for j in range(n):
-            if np.abs(mat[i][j] - mat[j][i]) > kTol: return False
-    return True
-
-def _IsInsideIntegerLatticePlanes(fx: int, fy: int, fz: int) -> bool:
-    '''Returns True if (fx, fy, fz) lies on or inside the tetrahedron bounded
-    by kIntegerLatticePlanes.
+def _IsInsideIntegerLatticePlanes(f: np.ndarray) -> np.ndarray:
+    '''Returns True for each frequency triplet that lies on or inside the
+    tetrahedron bounded by kIntegerLatticePlanes.
 
     Args:
-        fx: int - integer frequency in x direction.
-        fy: int - integer frequency in y direction.
-        fz: int - integer frequency in z direction.
+        f: (M, 3) - int array of frequency triplets (fx, fy, fz).
     Returns:
-        is_inside: bool - returns True if (fx, fy, fz) lies on or inside
+        is_inside: (M,) - bool array that is True where f lies on or inside
             kIntegerLatticePlanes.
     '''
-    for plane in kIntegerLatticePlanes:
-        nx, ny, nz = plane
-        if fx * nx + fy * ny + fz * nz > 0: return False
-    return True
+    return np.all(f @ kIntegerLatticePlanes.T <= 0, axis=1)
+
+def _EnumerateOrbits(max_f: int) -> \
+                     Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    '''Computes the unique (fx, fy, fz) frequency triplets up to max_f in
+    every direction as well as their transformations by the point symmetry
+    group (their orbits).
+
+    Args:
+        max_f: int - max frequency in each direction.
+    Returns:
+        keys: (K, 3) - int array of unique frequency triplets.
+        owners: (T,) - int array of index into keys of each orbit entry.
+            Sorted in ascending order.
+        subs: (T, 3) - int array of unique transformed frequency triplets in
+            the orbit of keys[owners].
+        counts: (T,) - int array of number of symmetries that map
+            keys[owners] to subs.
+    '''
+    mf = max_f
+    # Points inside kIntegerLatticePlanes satisfy fx >= fy >= |fz|, so only
+    # look at the box 0 <= fy <= fx, |fz| <= fx of each fx slab instead of the
+    # full (2 * max_f + 1)^3 cube, which is ~12x more points.
+    slabs = []
+    for fx in range(mf + 1):
+        slab = np.mgrid[fx:fx + 1, 0:fx + 1, -fx:fx + 1].reshape(3, -1).T
+        slabs.append(slab[_IsInsideIntegerLatticePlanes(slab)])
+    keys = np.concatenate(slabs)
+    # subs[k, s] = kSymmetries[s].T @ keys[k] for every key and symmetry.
+    subs = np.einsum('sji,kj->ksi', kSymmetries, keys).reshape(-1, 3)
+    owners = np.repeat(np.arange(len(keys)), len(kSymmetries))
+    # Pack each (owner, fx, fy, fz) into a single int64 so that counting the
+    # number of appearances of each subkey within the orbit of its key is a
+    # flat np.unique instead of a much slower row-wise one. Every component of
+    # a subkey lies in [-max_f, max_f]. Codes come back sorted by owner index.
+    w = 2 * mf + 1
+    shifted = subs + mf
+    codes = ((owners * w + shifted[:, 0]) * w + shifted[:, 1]) * w + \
+            shifted[:, 2]
+    codes, counts = np.unique(codes, return_counts=True)
+    # Unpack the codes back into owners and subkeys.
+    owner_codes, fz = np.divmod(codes, w)
+    owner_codes, fy = np.divmod(owner_codes, w)
+    owners, fx = np.divmod(owner_codes, w)
+    subs = np.stack((fx, fy, fz), axis=1) - mf
+    return keys, owners, subs, counts
+
+# Set to True once the pyFFTW plan cache has been enabled.
+_pyfftw_cache_enabled = False
+
+@contextlib.contextmanager
+def _FftBackend(use_pyfftw: bool, planner_effort: Optional[str]=None):
+    '''Context manager that routes scipy.fft calls through pyFFTW with plan
+    caching enabled if use_pyfftw is True, so repeated transforms of the same
+    shape reuse their FFTW plans. Otherwise, this does nothing and scipy's own
+    FFT implementation is used.
+
+    Args:
+        use_pyfftw: bool - if True, use pyFFTW. pyFFTW must be installed.
+        planner_effort: str - FFTW planner effort (e.g. 'FFTW_MEASURE') for
+            plans made inside the context. The previous planner effort is
+            restored on exit so other pyFFTW users in the process are
+            unaffected. If None, pyFFTW's default planner effort is used.
+    '''
+    if not use_pyfftw:
+        yield
+        return
+    # pyFFTW is optional, so only import it here.
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+    global _pyfftw_cache_enabled
+    if not _pyfftw_cache_enabled:
+        pyfftw.interfaces.cache.enable()
+        _pyfftw_cache_enabled = True
+    prev_planner_effort = pyfftw.config.PLANNER_EFFORT
+    if planner_effort is not None:
+        pyfftw.config.PLANNER_EFFORT = planner_effort
+    try:
+        with scipy.fft.set_backend(pyfftw.interfaces.scipy_fft):
+            yield
+    finally:
+        pyfftw.config.PLANNER_EFFORT = prev_planner_effort
+
+def _ZerosAligned(shape: Tuple[int, ...], dtype: np.dtype,
+                  use_pyfftw: bool) -> np.ndarray:
+    '''Returns a zero-filled array that is SIMD aligned for FFTW if
+    use_pyfftw is True, otherwise a regular numpy array.
+    '''
+    if not use_pyfftw: return np.zeros(shape, dtype=dtype)
+    import pyfftw
+    return pyfftw.zeros_aligned(shape, dtype=dtype)
+
+def _GridAxes(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> \
+              Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    '''Returns the 1D axes that x, y, z were generated from if they form a
+    grid created by np.meshgrid with indexing='ij'.
+
+    Args:
+        x: (P, Q, R) - float array of x values.
+        y: (P, Q, R) - float array of y values.
+        z: (P, Q, R) - float array of z values.
+    Returns:
+        axes: ((P,), (Q,), (R,)) - x, y, z axes, or None if x, y, z do not
+            form a grid.
+    '''
+    xv, yv, zv = x[:, 0, 0], y[0, :, 0], z[0, 0, :]
+    if not np.array_equal(x, np.broadcast_to(xv[:, None, None], x.shape)):
+        return None
+    if not np.array_equal(y, np.broadcast_to(yv[None, :, None], y.shape)):
+        return None
+    if not np.array_equal(z, np.broadcast_to(zv[None, None, :], z.shape)):
+        return None
+    return xv, yv, zv
 
 class TetSymmetry:
     def __init__(self, data: np.ndarray, normal_to_face: bool=False,
-                 copy_data: bool=True):
+                 copy_data: bool=True, dtype: Optional[np.dtype]=None,
+                 use_pyfftw: bool=False, planner_effort: Optional[str]=None):
         '''This class fits a set of achiral tetrahedrally symmetric (Td) basis
         functions to input grid data.
 
@@ -180,8 +282,25 @@ class TetSymmetry:
                 TODO(rchensix): Link to paper section explaining what
                 normal_to_face does.
             copy_data: bool - if True, copies data and stores in this class.
+                The copy is overwritten by the FFT and released once the
+                coefficients are computed, so self.data is None afterwards.
                 If False, data is not copied and user MUST ensure that data
                 passed in is not changed.
+            dtype: np.dtype - precision to store data and coefficients in.
+                Must be None, np.float64 or np.float32. If None, data is used
+                as is, so single precision data (np.float32 or np.complex64)
+                stays in single precision and anything else is computed in
+                double precision. Otherwise, complex data is stored as the
+                complex type of the same precision, and data is converted
+                (and therefore copied regardless of copy_data) if it is not
+                already of this type. np.float32 halves memory traffic of the
+                FFTs at the cost of accuracy.
+            use_pyfftw: bool - if True, computes FFTs with pyFFTW (which must
+                be installed) and caches FFTW plans across calls.
+            planner_effort: str - FFTW planner effort used when use_pyfftw is
+                True, e.g. 'FFTW_MEASURE'. Higher effort makes planning much
+                slower and is only worth it if the same instance evaluates
+                many times. If None, pyFFTW's default is used.
         '''
         assert len(data.shape) == 3, 'data must be of shape (N, N, N)'
         n = data.shape[0]
@@ -189,48 +308,143 @@ class TetSymmetry:
             'data must be of shape (N, N, N)'
         assert n > 2, 'cannot construct approximation with N={}'.format(n)
         self.n = n
-        self.data = np.copy(data) if copy_data else data
+        if dtype is None:
+            self.data = np.copy(data) if copy_data else data
+            is_single = data.dtype in (np.float32, np.complex64)
+        else:
+            dtype = np.dtype(dtype)
+            assert dtype in (np.float32, np.float64), \
+                'dtype must be None, np.float32 or np.float64'
+            if np.iscomplexobj(data):
+                dtype = np.result_type(dtype, np.complex64)
+            self.data = data.astype(dtype, copy=copy_data)
+            is_single = np.finfo(dtype).dtype == np.float32
+        # If data was copied, the FFT is free to overwrite it.
+        self._owns_data = self.data is not data
         self.normal_to_face = normal_to_face
-        self.kTol = 1e-12  # Used to compare against 0
+        self.use_pyfftw = use_pyfftw
+        self.planner_effort = planner_effort
+        # Used to compare against 0
+        self.kTol = 1e-6 if is_single else 1e-12
         self._ComputeCoeffs()
 
+    # The mappings below are read-only convenience views of the coefficient
+    # arrays keyed by frequency triplet. They are only built the first time
+    # they are accessed since building them loops over every orbit entry in
+    # Python.
+    @functools.cached_property
+    def freqs(self) -> Mapping:
+        '''Read-only mapping from each unique (fx, fy, fz) frequency triplet
+        to a read-only mapping from each triplet in its orbit to its number of
+        appearances.
+        '''
+        key_list = self._KeyList()
+        freqs = {key: dict() for key in key_list}
+        for owner, (fx, fy, fz), count in zip(self._subkey_owner.tolist(),
+                                              self._subkeys.tolist(),
+                                              self._subkey_mult.tolist()):
+            freqs[key_list[owner]][(fx, fy, fz)] = count
+        return types.MappingProxyType(
+            {key: types.MappingProxyType(orbit)
+             for key, orbit in freqs.items()})
+
+    @functools.cached_property
+    def basis_coeffs(self) -> Mapping:
+        '''Read-only mapping from each unique frequency triplet to its
+        coefficient.
+        '''
+        return types.MappingProxyType(
+            dict(zip(self._KeyList(), self._basis_coeffs)))
+
+    @functools.cached_property
+    def normalizing_coeffs(self) -> Mapping:
+        '''Read-only mapping from each unique frequency triplet to the
+        normalizing coefficient of its basis function.
+        '''
+        return types.MappingProxyType(
+            dict(zip(self._KeyList(), self._normalizing_coeffs)))
+
+    def _KeyList(self) -> list:
+        '''Returns the unique frequency triplets as a list of tuples.
+        '''
+        return [tuple(key) for key in self._keys.tolist()]
+
     def EvaluateNaive(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) \
                       -> np.ndarray:
         '''Evaluate the fitted function on points specified by x, y, z.
         The inputs x, y, z should be generated using np.meshgrid with
-        indexing='ij'.
+        indexing='ij'. Alternatively, x, y, z can be the 1D axes of the grid,
+        which avoids allocating the full meshgrid.
 
-        NOTE: This function is naive in that it brute force evaluates each term
-        and loops through all terms. There are probably more efficient ways of
-        doing this, such as using scipy.fft.ifftn.
+        NOTE: If x, y, z form a grid, the function is evaluated as a separable
+        sum over 1D exponential tables. Only if x, y, z do not form a grid
+        does it fall back to brute force evaluating each term and looping
+        through all terms.
 
         Args:
-            x: (P, Q, R) - float array of x values.
-            y: (P, Q, R) - float array of y values.
-            z: (P, Q, R) - float array of z values.
+            x: (P, Q, R) or (P,) - float array of x values.
+            y: (P, Q, R) or (Q,) - float array of y values.
+            z: (P, Q, R) or (R,) - float array of z values.
         Returns:
             vals: (P, Q, R) - evaluated complex values.
         '''
-        assert len(x.shape) == 3, 'x, y, z must be of shape (P, Q, R)'
-        assert x.shape == y.shape and x.shape == z.shape, \
-            'x, y, z must all be the same shape'
-        p, q, r = x.shape
-        vals = np.zeros(p * q * r, dtype='complex128')
-        xyz = np.concatenate((x.reshape(-1, 1), y.reshape(-1, 1),
-                              z.reshape(-1, 1)), axis=1)
+        if len(x.shape) == 1 and len(y.shape) == 1 and len(z.shape) == 1:
+            axes = (x, y, z)
+            out_shape = (len(x), len(y), len(z))
+        else:
+            assert len(x.shape) == 3, 'x, y, z must be of shape (P, Q, R)'
+            assert x.shape == y.shape and x.shape == z.shape, \
+                'x, y, z must all be the same shape'
+            axes = _GridAxes(x, y, z)
+            out_shape = x.shape
+        p, q, r = out_shape
+        if self.is_real:
+            freqs, coeffs = self._half_freqs, self._half_vals
+        else:
+            freqs, coeffs = self._packed_freqs, self._packed_vals
+        if axes is not None:
+            vals = self._EvaluateGridSeparable(axes, freqs, coeffs)
+            if self.is_real: vals.imag = 0
+            return vals
+        vals = np.zeros(p * q * r, dtype=self.coeff_dtype)
         # NOTE: scipy.fft assumes input was discretized in the domain [0, 1]^3.
         # However, we assume the input was discretized in the domain
         # [-0.5, 0.5)^3, so we do a shift here by 0.5 in every direction.
-        xyz += 0.5
-        for key, subkey_dict in self.freqs.items():
-            # Skip terms with nearly zero coefficients.
-            if np.abs(self.basis_coeffs[key]) < self.kTol: continue
-            for subkey, num_appearances in subkey_dict.items():
-                f = np.array(subkey)
-                vals += self.basis_coeffs[key] * self.normalizing_coeffs[key] \
-                        * num_appearances * np.exp(2j * np.pi * xyz.dot(f))
-        return vals.reshape(x.shape)
-    
+        # The 2 pi i factor is also applied once here instead of per term.
+        wx, wy, wz = [(v.ravel() + 0.5) * (2j * np.pi) for v in (x, y, z)]
+        for (fx, fy, fz), coeff in zip(freqs.tolist(), coeffs):
+            vals += coeff * np.exp(wx * fx + wy * fy + wz * fz)
+        if self.is_real: vals.imag = 0
+        return vals.reshape(out_shape)
+
+    def _EvaluateGridSeparable(self,
+                               axes: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                               freqs: np.ndarray, coeffs: np.ndarray) \
+                               -> np.ndarray:
+        '''Evaluate the fitted function on an arbitrary grid using the fact
+        that exp(2 pi i (x fx + y fy + z fz)) = exp(2 pi i x fx) *
+        exp(2 pi i y fy) * exp(2 pi i z fz). The exponentials are tabulated
+        once per axis, so no exponentials are evaluated per grid point.
+
+        Args:
+            axes: ((P,), (Q,), (R,)) - x, y, z axes of the grid.
+            freqs: (M, 3) - int array of frequency triplets. See _PackTerms.
+            coeffs: (M,) - complex coefficients. See _PackTerms.
+        Returns:
+            vals: (P, Q, R) - evaluated complex values.
+        '''
+        # Gather coefficients into a cube indexed by frequency - min_f. For
+        # real data only the half space fz >= 0 is needed.
+        mf = self.max_f
+        min_f = np.array([-mf, -mf, 0 if self.is_real else -mf])
+        cube = np.zeros(mf + 1 - min_f, dtype=self.coeff_dtype)
+        np.add.at(cube, tuple((freqs - min_f).T), coeffs)
+        # The 0.5 shift is the same one applied in EvaluateNaive.
+        ex, ey, ez = [np.exp(2j * np.pi * np.outer(v + 0.5,
+                                                   np.arange(lo, mf + 1)))
+                      .astype(self.coeff_dtype) for v, lo in zip(axes, min_f)]
+        return np.einsum('ai,bj,ck,ijk->abc', ex, ey, ez, cube, optimize=True)
+
     def EvaluateUnitCube(self, res: int) -> np.ndarray:
         '''Evaluate the fitted function on the res x res x res grid spanning
         the domain [-0.5, 0.5)^3. For example, the result at index [0, 0, 0]
@@ -245,50 +459,42 @@ class TetSymmetry:
         '''
         res_actual = res
         if res < self.n:
-            res_actual = int(np.ceil(self.n / res)) * res
+            # Evaluate on a finer grid whose resolution is a multiple of res
+            # and subsample. Prefer a multiple that scipy.fft handles
+            # efficiently, since large prime factors are slow.
+            skip = int(np.ceil(self.n / res))
+            for s in range(skip, 2 * skip + 1):
+                if scipy.fft.next_fast_len(s * res, real=self.is_real) == \
+                   s * res:
+                    skip = s
+                    break
+            res_actual = skip * res
         # Create fft grid of size res_actual^3 if complex or if real, set last
         # axis to length res_actual // 2 + 1.
         if self.is_real:
-            fft = np.zeros((res_actual, res_actual, res_actual // 2 + 1),
-                           dtype='complex128')
+            fft = _ZerosAligned((res_actual, res_actual, res_actual // 2 + 1),
+                                self.coeff_dtype, self.use_pyfftw)
         else:
-            fft = np.zeros((res_actual, res_actual, res_actual),
-                           dtype='complex128')
+            fft = _ZerosAligned((res_actual, res_actual, res_actual),
+                                self.coeff_dtype, self.use_pyfftw)
 
         # Fill fft grid with coefficient values.
-        # TODO(rchensix): Cache this fft grid since it only needs to be shifted
-        # for different res_actual values.
-        for key, subkey_dict in self.freqs.items():
-            # Skip terms with nearly zero coefficients.
-            if np.abs(self.basis_coeffs[key]) < self.kTol: continue
-            for subkey, num_appearances in subkey_dict.items():
-                fx, fy, fz = subkey
-                if self.is_real:
-                    take_conj = fz < 0
-                    if take_conj:
-                        fx = -fx
-                        fy = -fy
-                        fz = -fz
-                    idx0 = fx if fx >= 0 else fx + res_actual
-                    idx1 = fy if fy >= 0 else fy + res_actual
-                    idx2 = fz  # Should always be non-negative
-                    coeff = self.basis_coeffs[key] * \
-                            self.normalizing_coeffs[key] * \
-                            num_appearances
-                    if take_conj: coeff = np.conj(coeff)
-                    fft[idx0, idx1, idx2] = coeff
-                else:
-                    idx0 = fx if fx >= 0 else fx + res_actual
-                    idx1 = fy if fy >= 0 else fy + res_actual
-                    idx2 = fz if fz >= 0 else fz + res_actual
-                    fft[idx0, idx1, idx2] = self.basis_coeffs[key] * \
-                                            self.normalizing_coeffs[key] * \
-                                            num_appearances
+        freqs = self._packed_freqs
+        coeffs = self._packed_vals
         if self.is_real:
-            result = scipy.fft.irfftn(fft, s=np.full(3, res_actual),
-                                      norm='forward')
-        else:
-            result = scipy.fft.ifftn(fft, norm='forward')
+            # Only non-negative fz are stored, so get the conjugate of
+            # (-fx, -fy, -fz) instead wherever fz is negative.
+            take_conj = freqs[:, 2] < 0
+            freqs = np.where(take_conj[:, None], -freqs, freqs)
+            coeffs = np.where(take_conj, np.conj(coeffs), coeffs)
+        idx = np.where(freqs >= 0, freqs, freqs + res_actual)
+        fft[idx[:, 0], idx[:, 1], idx[:, 2]] = coeffs
+        with _FftBackend(self.use_pyfftw, self.planner_effort):
+            if self.is_real:
+                result = scipy.fft.irfftn(fft, s=np.full(3, res_actual),
+                                          norm='forward', workers=-1)
+            else:
+                result = scipy.fft.ifftn(fft, norm='forward', workers=-1)
         if res < self.n:
             skip = res_actual // res
             return result[::skip, ::skip, ::skip]
@@ -302,73 +508,107 @@ class TetSymmetry:
         # NOTE: The norm='forward' part is necessary to get the 1/N scaling.
         # See https://www.johndcook.com/blog/2021/03/20/fourier-series-fft/
         self.is_real = np.all(np.isreal(self.data))
-        if self.is_real:
-            self.rfftn = scipy.fft.rfftn(self.data, norm='forward')
-        else:
-            self.fftn = scipy.fft.fftn(self.data, norm='forward')
+        with _FftBackend(self.use_pyfftw, self.planner_effort):
+            if self.is_real:
+                self.rfftn = scipy.fft.rfftn(self.data, norm='forward',
+                                             workers=-1,
+                                             overwrite_x=self._owns_data)
+                self.coeff_dtype = self.rfftn.dtype
+            else:
+                self.fftn = scipy.fft.fftn(self.data, norm='forward',
+                                           workers=-1,
+                                           overwrite_x=self._owns_data)
+                self.coeff_dtype = self.fftn.dtype
+        # The data may have been overwritten, so don't hold on to it.
+        if self._owns_data: self.data = None
         # Max frequency to compute is Nyquist frequency.
         self.max_f = self.n // 2 if self.n % 2 == 1 else self.n // 2 - 1
         # Compute unique (fx, fy, fz) frequency triplets as well as their
-        # transformations by the point symmetry group.
-        self.freqs = dict()
-        for fx in range(-self.max_f, self.max_f + 1):
-            for fy in range(-self.max_f, self.max_f + 1):
-                for fz in range(-self.max_f, self.max_f + 1):
-                    if not _IsInsideIntegerLatticePlanes(fx, fy, fz): continue
-                    key = (fx, fy, fz)
-                    assert key not in self.freqs
-                    self.freqs[key] = dict()
-                    for m in kSymmetries:
-                        subkey = tuple(m.transpose() @ np.array(key))
-                        if subkey in self.freqs[key]:
-                            self.freqs[key][subkey] += 1
-                        else:
-                            self.freqs[key][subkey] = 1
+        # transformations by the point symmetry group. The orbits are kept as
+        # flat arrays: _subkeys[i] appears _subkey_mult[i] times in the orbit
+        # of _keys[_subkey_owner[i]].
+        self._keys, self._subkey_owner, self._subkeys, self._subkey_mult = \
+            _EnumerateOrbits(self.max_f)
         # Compute coefficient for each unique frequency triplet as well as
         # normalizing coefficient out front to ensure the basis functions are
         # orthonormal.
-        self.basis_coeffs = dict()
-        self.normalizing_coeffs = dict()
-        for key, subfreq_dict in self.freqs.items():
-            normalizing_coeff = 0
-            basis_coeff_sum = 0
-            for subkey, num_appearances in subfreq_dict.items():
-                # Get the FFT coefficient corresponding to subkey.
-                basis_coeff_sum += num_appearances * self._GetCoeff(subkey)
-                normalizing_coeff += num_appearances**2
-            self.normalizing_coeffs[key] = 1.0 / np.sqrt(normalizing_coeff)
-            self.basis_coeffs[key] = basis_coeff_sum * \
-                                     self.normalizing_coeffs[key]
+        num_keys = len(self._keys)
+        self._normalizing_coeffs = 1.0 / np.sqrt(
+            np.bincount(self._subkey_owner, weights=self._subkey_mult**2,
+                        minlength=num_keys))
+        # Orbit entries are sorted by owner, so each key's terms are a
+        # contiguous segment.
+        starts = np.flatnonzero(np.diff(self._subkey_owner, prepend=-1))
+        basis_coeff_sums = np.add.reduceat(
+            self._subkey_mult * self._GetCoeffs(self._subkeys), starts)
+        self._basis_coeffs = basis_coeff_sums * self._normalizing_coeffs
         # Maybe modify the coefficients if normal_to_face=True.
         if self.normal_to_face: self._ComputeCoeffsNormalToFace()
+        # The coefficients are accumulated in double precision above, but are
+        # stored in the precision of the FFT.
+        self._normalizing_coeffs = self._normalizing_coeffs.astype(
+            np.finfo(self.coeff_dtype).dtype)
+        self._basis_coeffs = self._basis_coeffs.astype(self.coeff_dtype)
+        # Cache the terms of the fitted function for the evaluation methods.
+        self._effective_coeffs = self._basis_coeffs * self._normalizing_coeffs
+        self._packed_freqs, self._packed_vals = self._PackTerms()
+        # For real data, the terms at f and -f are complex conjugates of each
+        # other, so EvaluateNaive only sums over half of them and takes the
+        # real part.
+        if self.is_real:
+            self._half_freqs, self._half_vals = self._HalfSpaceTerms()
     
-    def _GetCoeff(self, f: Tuple[int, int, int]) -> float:
-        '''Get FFT coefficient at (fx, fy, fz).
+    def _PackTerms(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''Collects the frequency triplet and coefficient of every term in the
+        fitted function, skipping terms with nearly zero coefficients.
+
+        Returns:
+            freqs: (M, 3) - int array of frequency triplets.
+            coeffs: (M,) - complex coefficient of each frequency triplet.
+        '''
+        owners = self._subkey_owner
+        is_active = (np.abs(self._basis_coeffs) >= self.kTol)[owners]
+        coeffs = self._effective_coeffs[owners] * self._subkey_mult
+        return self._subkeys[is_active], \
+               coeffs[is_active].astype(self.coeff_dtype)
+
+    def _HalfSpaceTerms(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''For real data, the coefficient at -f is the conjugate of the
+        coefficient at f. Collects the terms in the half space fz > 0, or
+        fz = 0 and fy > 0, or fz = fy = 0 and fx >= 0, doubling all but the
+        constant term, so that the real part of their sum is the fitted
+        function.
+
+        Returns:
+            freqs: (M, 3) - int array of frequency triplets.
+            coeffs: (M,) - complex coefficient of each frequency triplet.
+        '''
+        fx, fy, fz = self._packed_freqs.T
+        is_half = (fz > 0) | ((fz == 0) & ((fy > 0) | ((fy == 0) & (fx >= 0))))
+        freqs = self._packed_freqs[is_half]
+        coeffs = self._packed_vals[is_half]
+        coeffs = np.where(np.any(freqs != 0, axis=1), 2 * coeffs, coeffs)
+        return freqs, coeffs.astype(self.coeff_dtype)
+
+    def _GetCoeffs(self, f: np.ndarray) -> np.ndarray:
+        '''Get FFT coefficients at every (fx, fy, fz).
 
         Args:
-            f: Tuple[int, int, int] - frequency triplet (fx, fy, fz)
+            f: (M, 3) - int array of frequency triplets (fx, fy, fz).
         Returns:
-            coeff: float - complex-valued coefficient.
+            coeffs: (M,) - complex-valued coefficients.
         '''
-        fx, fy, fz = f
         if self.is_real:
-            take_conj = fz < 0
             # If fz is negative, get the conjugate of (-fx, -fy, -fz) instead
-            if take_conj:
-                fx = -fx
-                fy = -fy
-                fz = -fz
-            idx0 = fx if fx >= 0 else fx + self.n
-            idx1 = fy if fy >= 0 else fy + self.n
-            idx2 = fz  # Should always be non-negative
-            coeff = self.rfftn[idx0, idx1, idx2]
-            if take_conj: coeff = np.conj(coeff)
-            return coeff
+            take_conj = f[:, 2] < 0
+            f = np.where(take_conj[:, None], -f, f)
+            # fz should always be non-negative now.
+            idx = np.where(f >= 0, f, f + self.n)
+            coeffs = self.rfftn[idx[:, 0], idx[:, 1], idx[:, 2]]
+            return np.where(take_conj, np.conj(coeffs), coeffs)
         else:
-            idx0 = fx if fx >= 0 else fx + self.n
-            idx1 = fy if fy >= 0 else fy + self.n
-            idx2 = fz if fz >= 0 else fz + self.n
-            return self.fftn[idx0, idx1, idx2]
+            idx = np.where(f >= 0, f, f + self.n)
+            return self.fftn[idx[:, 0], idx[:, 1], idx[:, 2]]
     
     def _ComputeCoeffsNormalToFace(self):
         # Get affine transform that projects points onto all four tetrahedron
@@ -404,86 +644,54 @@ class TetSymmetry:
             # [0, 0, -0.5],
             # [0, 0, -0.5],
         ])
+        # Skip the constant term since it doesn't contribute to the gradient.
+        is_constant = np.all(self._keys[self._subkey_owner] == 0, axis=1)
+        owners = self._subkey_owner[~is_constant]
+        subs = self._subkeys[~is_constant]
+        mults = self._subkey_mult[~is_constant]
+        constraints = []
         for i in range(1):
             p_t = proj_mats_transp[i]
             b = offsets[i]
             n = normals[i]
             # Collect all equality constraint equations.
-            # There is one equation per unique p_t @ f_subkey.
-            # The unknowns are the coefficients for each unique f.
-            constraints = dict()
-            for key, subfreq_dict in self.freqs.items():
-                # Skip the constant term since it doesn't contribute to the
-                # gradient.
-                if key == (0, 0, 0): continue
-                for subkey, num_appearances in subfreq_dict.items():
-                    f_subkey = np.array(subkey)
-                    f_proj = p_t.dot(f_subkey)
-                    b_term = np.exp(2j * np.pi * b.dot(f_subkey))
-                    grad_term = 2j * np.pi * n.dot(f_subkey)
-                    coeff = self.normalizing_coeffs[key] * num_appearances * \
-                            b_term * grad_term
-                    projkey = tuple(f_proj)
-                    if projkey in constraints:
-                        if key in constraints[projkey]:
-                            constraints[projkey][key] += coeff
-                        else:
-                            constraints[projkey][key] = coeff
-                    else:
-                        constraints[projkey] = {
-                            key: coeff
-                        }
+            # There is one equation (row) per unique p_t @ f_subkey.
+            # The unknowns (columns) are the coefficients for each unique f.
+            f_proj = subs @ p_t.T
+            b_term = np.exp(2j * np.pi * subs.dot(b))
+            grad_term = 2j * np.pi * subs.dot(n)
+            coeffs = self._normalizing_coeffs[owners] * mults * b_term * \
+                     grad_term
+            _, rows = np.unique(f_proj, axis=0, return_inverse=True)
+            a = np.zeros((rows.max() + 1, len(self._keys)), dtype='complex128')
+            np.add.at(a, (rows.ravel(), owners), coeffs)
+            constraints.append(a)
+        a = np.concatenate(constraints)
         # Prune out any constraint equations where every entry is 0.
-        self.constraints = dict()
-        for projkey, coeffs_dict in constraints.items():
-            is_nonzero = False
-            for _, coeff in coeffs_dict.items():
-                if np.abs(coeff) > self.kTol:
-                    is_nonzero = True
-                    break
-            if is_nonzero:
-                self.constraints[projkey] = coeffs_dict
-        self._OptimizeCoeffs()
+        a = a[np.any(np.abs(a) > self.kTol, axis=1)]
+        self._OptimizeCoeffs(a)
     
-    def _OptimizeCoeffs(self):
-        # Put the cvxpy import here since this is the only method that needs it.
-        # This makes it easier to run other methods in TetSymmetry since cvxpy
-        # does not get along with many geometry packages on my computer.
-        import cvxpy as cp
-        key_to_index = dict()
-        num_keys = 0
-        for key in self.freqs:
-            # Skip the constant term since it's known and won't be changed.
-            if key == (0, 0, 0): continue
-            key_to_index[key] = num_keys
-            num_keys += 1
-
-        # Set up q, p, a, b matrices.
-        # See https://www.cvxpy.org/examples/basic/quadratic_program.html
-        p = np.eye(num_keys)
-        q = np.zeros(num_keys, dtype='complex128')
-        for key, index in key_to_index.items():
-            q[index] = self.basis_coeffs[key]
-        num_constraints = len(self.constraints)
-        a = np.zeros((num_constraints, num_keys), dtype='complex128')
-        b = np.zeros(num_constraints)
-        row = 0
-        for _, coeffs_dict in self.constraints.items():
-            for key, coeff in coeffs_dict.items():
-                index = key_to_index[key]
-                a[row, index] = coeff
-            row += 1
-
-        # Define and solve the CVXPY problem.
-        x = cp.Variable(num_keys, complex=True)
-        obj = cp.Minimize(cp.quad_form(x, p) - 2 * cp.real(q.T @ x))
-        prob = cp.Problem(obj, [a @ x == b])
-        prob.solve(verbose=True)
-        # Print result.
-        print("\nThe optimal value is", prob.value)
-        sol = x.value
-        print("A solution x is", sol)
+    def _OptimizeCoeffs(self, a: np.ndarray):
+        '''Replaces the basis coefficients q with the closest coefficients x
+        that satisfy the constraint equations a @ x = 0, i.e. solves
+            minimize ||x - q||^2 subject to a @ x = 0.
+        This is the projection of q onto the null space of a, which has the
+        closed form x = q - pinv(a) @ a @ q.
+
+        Args:
+            a: (C, K) - complex array of C constraint equations. Column j
+                corresponds to self._keys[j].
+        '''
+        if len(a) == 0: return
+        # Skip the constant term since it's known and won't be changed.
+        is_constant = np.all(self._keys == 0, axis=1)
+        a = a[:, ~is_constant]
+        q = self._basis_coeffs[~is_constant]
+
+        # The constraint equations may be linearly dependent, so use the
+        # minimum norm least squares solution instead of inverting a @ a^H.
+        correction, _, _, _ = np.linalg.lstsq(a, a @ q, rcond=None)
+        sol = q - correction
 
         # Set new coefficients
-        for key, index in key_to_index.items():
-            self.basis_coeffs[key] = sol[index]
+        self._basis_coeffs[~is_constant] = sol
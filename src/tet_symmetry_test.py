@@ -5,9 +5,11 @@
 
 import tet_symmetry
 
+import importlib.util
 import unittest
 
 import numpy as np
+import scipy.fft
 
 class TestTetSymmetry(unittest.TestCase):
     def test_basic(self):
@@ -23,6 +25,25 @@ class TestTetSymmetry(unittest.TestCase):
         vals = ts.EvaluateNaive(x, y, z)
         self.assertLess(np.linalg.norm(data - vals), 1.0e-6)
 
+    def test_coeff_views(self):
+        '''The dicts keyed by frequency triplet should match the coefficient
+        arrays and should not be modifiable.
+        '''
+        n = 6
+        rng = np.random.default_rng(0)
+        ts = tet_symmetry.TetSymmetry(rng.standard_normal((n, n, n)))
+        self.assertEqual(list(ts.basis_coeffs.values()),
+                         list(ts._basis_coeffs))
+        self.assertEqual(sum(len(orbit) for orbit in ts.freqs.values()),
+                         len(ts._subkeys))
+        key = next(iter(ts.freqs))
+        with self.assertRaises(TypeError):
+            ts.basis_coeffs[key] = 0.0
+        with self.assertRaises(TypeError):
+            ts.normalizing_coeffs[key] = 0.0
+        with self.assertRaises(TypeError):
+            ts.freqs[key][key] = 0
+
     def test_face_normal(self):
         '''Feed in grid data that is already tetrahedrally symmetric. Create an
         approximation for grid data with face normal constraints turned on, and
@@ -62,6 +83,52 @@ class TestTetSymmetry(unittest.TestCase):
         vals = ts.EvaluateUnitCube(4)
         self.assertLess(np.linalg.norm(data - vals), 1.0e-6)
     
+    def test_single_precision(self):
+        '''Same as test_eval_ifft but with data and coefficients stored in
+        single precision.
+        '''
+        n = 4
+        v = np.arange(-n // 2, n // 2) / n
+        x, y, z = np.meshgrid(v, v, v, indexing='ij')
+        data = np.cos(2.0 * np.pi * x) + np.cos(2.0 * np.pi * y) + \
+               np.cos(2.0 * np.pi * z)
+        ts = tet_symmetry.TetSymmetry(data, dtype=np.float32)
+        for coeffs in [ts._basis_coeffs, ts._effective_coeffs,
+                       ts._packed_vals]:
+            self.assertEqual(coeffs.dtype, np.complex64)
+        self.assertEqual(ts._normalizing_coeffs.dtype, np.float32)
+        vals = ts.EvaluateUnitCube(4)
+        self.assertEqual(vals.dtype, np.float32)
+        self.assertLess(np.linalg.norm(data - vals), 1.0e-5)
+
+    def test_data_ownership(self):
+        '''Data passed in with copy_data=False must not be overwritten by the
+        FFT. Data owned by TetSymmetry (copied, or converted to another dtype)
+        is released after the coefficients are computed.
+        '''
+        n = 8
+        rng = np.random.default_rng(0)
+        for dtype in [np.float64, np.float32]:
+            data = rng.standard_normal((n, n, n)).astype(dtype)
+            data_orig = np.copy(data)
+            ts = tet_symmetry.TetSymmetry(data, copy_data=False, dtype=dtype)
+            self.assertIs(ts.data, data)
+            self.assertTrue(np.array_equal(data, data_orig))
+            ts = tet_symmetry.TetSymmetry(data, dtype=dtype)
+            self.assertIsNone(ts.data)
+            self.assertTrue(np.array_equal(data, data_orig))
+        # With the default dtype, single precision data is used as is.
+        data = rng.standard_normal((n, n, n)).astype(np.float32)
+        ts = tet_symmetry.TetSymmetry(data, copy_data=False)
+        self.assertIs(ts.data, data)
+        self.assertEqual(ts.rfftn.dtype, np.complex64)
+        # Converting float64 data to float32 makes a copy, which is owned.
+        data = rng.standard_normal((n, n, n))
+        data_orig = np.copy(data)
+        ts = tet_symmetry.TetSymmetry(data, copy_data=False, dtype=np.float32)
+        self.assertIsNone(ts.data)
+        self.assertTrue(np.array_equal(data, data_orig))
+
     def test_eval_small_res(self):
         '''Feed in grid data at a resolution of N, and evaluate at a resolution
         of res < N.
@@ -81,5 +148,92 @@ class TestTetSymmetry(unittest.TestCase):
                    np.cos(2.0 * np.pi * zres)
         self.assertLess(np.linalg.norm(data_res - vals), 1.0e-6)
 
+    def test_eval_naive_grid(self):
+        '''Evaluate on a uniformly spaced grid that extends past the unit cube
+        and compare against evaluating the same points one by one.
+        '''
+        n = 8
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((n, n, n))
+        ts = tet_symmetry.TetSymmetry(data)
+        v = np.arange(-0.45, 1.0, 1 / 6)
+        x, y, z = np.meshgrid(v, v[:5], v[:2], indexing='ij')
+        vals = ts.EvaluateNaive(x, y, z)
+        vals_pts = ts.EvaluateNaive(x.reshape(-1, 1, 1), y.reshape(-1, 1, 1),
+                                    z.reshape(-1, 1, 1))
+        self.assertLess(np.linalg.norm(vals_pts.reshape(x.shape) - vals),
+                        1.0e-6)
+
+    def test_eval_naive_separable(self):
+        '''Evaluate on an irregular grid (separable method) and compare against
+        evaluating the same points one by one.
+        '''
+        n = 8
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((n, n, n))
+        ts = tet_symmetry.TetSymmetry(data)
+        x, y, z = np.meshgrid(rng.uniform(-0.5, 0.5, 5),
+                              rng.uniform(-0.5, 0.5, 4),
+                              rng.uniform(-0.5, 0.5, 3), indexing='ij')
+        vals = ts.EvaluateNaive(x, y, z)
+        vals_pts = ts.EvaluateNaive(x.reshape(-1, 1, 1), y.reshape(-1, 1, 1),
+                                    z.reshape(-1, 1, 1))
+        self.assertLess(np.linalg.norm(vals_pts.reshape(x.shape) - vals),
+                        1.0e-6)
+
+    def test_eval_naive_axes(self):
+        '''Evaluate by passing in the 1D axes of a grid and compare against
+        evaluating the same points one by one.
+        '''
+        n = 8
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((n, n, n))
+        ts = tet_symmetry.TetSymmetry(data)
+        xvec = rng.uniform(-0.5, 0.5, 5)
+        yvec = np.arange(-n // 2, n // 2) / n
+        zvec = rng.uniform(-0.5, 0.5, 3)
+        x, y, z = np.meshgrid(xvec, yvec, zvec, indexing='ij')
+        vals = ts.EvaluateNaive(xvec, yvec, zvec)
+        self.assertEqual(vals.shape, x.shape)
+        # Points laid out as a (P, 1, 1) array are not a grid, so this goes
+        # through the per-point path.
+        vals_pointwise = ts.EvaluateNaive(x.reshape(-1, 1, 1),
+                                          y.reshape(-1, 1, 1),
+                                          z.reshape(-1, 1, 1)).reshape(x.shape)
+        self.assertLess(np.linalg.norm(vals_pointwise - vals), 1.0e-6)
+
+    @unittest.skipIf(importlib.util.find_spec('pyfftw') is None,
+                     'pyFFTW is not installed')
+    def test_pyfftw_backend(self):
+        '''FFTs computed through the opt-in pyFFTW backend should match the
+        ones computed by scipy, and the backend should not leak its planner
+        settings.
+        '''
+        import pyfftw
+        n = 12
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((n, n, n))
+        planner_effort = pyfftw.config.PLANNER_EFFORT
+        spectrum = tet_symmetry._ZerosAligned((n, n, n // 2 + 1),
+                                              'complex128', True)
+        self.assertTrue(pyfftw.is_byte_aligned(spectrum))
+        with tet_symmetry._FftBackend(True, 'FFTW_MEASURE'):
+            spectrum[:] = scipy.fft.rfftn(data, norm='forward', workers=-1)
+            vals = scipy.fft.irfftn(spectrum, s=data.shape, norm='forward',
+                                    workers=-1)
+        self.assertEqual(pyfftw.config.PLANNER_EFFORT, planner_effort)
+        self.assertLess(np.abs(scipy.fft.rfftn(data, norm='forward') -
+                               spectrum).max(), 1.0e-12)
+        self.assertLess(np.abs(data - vals).max(), 1.0e-12)
+        # The fitted function should also match the one computed with scipy.
+        ts = tet_symmetry.TetSymmetry(data, use_pyfftw=True,
+                                      planner_effort='FFTW_MEASURE')
+        ts_scipy = tet_symmetry.TetSymmetry(data)
+        self.assertLess(np.abs(ts._basis_coeffs -
+                               ts_scipy._basis_coeffs).max(), 1.0e-12)
+        self.assertLess(np.abs(ts.EvaluateUnitCube(7) -
+                               ts_scipy.EvaluateUnitCube(7)).max(), 1.0e-12)
+        self.assertEqual(pyfftw.config.PLANNER_EFFORT, planner_effort)
+
 if __name__ == '__main__':
     unittest.main()